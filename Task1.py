@@ -1,13 +1,13 @@
 import os
-import pdfplumber
 import re
+from Task4.pdf_text import open_pages
 
 pdfpath = r"C:\Users\jebapriya.jayapal\Downloads\AI_11_ISC_2 1.pdf"
 
 if os.path.exists(pdfpath):
     try:
-        with pdfplumber.open(pdfpath) as pdf:
-            pages_text = [re.sub(r"[^A-Za-z0-9 ]", "", page.extract_text() or "") for page in pdf.pages]
+        with open_pages(pdfpath) as pages:
+            pages_text = [re.sub(r"[^A-Za-z0-9 ]", "", page.text()) for page in pages]
 
         print(f"Total pages extracted: {len(pages_text)}\n")
         print("Text from page 1:")
@@ -1,6 +1,6 @@
-import pdfplumber
 import json
 import os
+from Task4.pdf_text import open_pages
 
 pdf_path = r"C:\Users\jebapriya.jayapal\Downloads\AI_11_ISC_2 1.pdf"
 output_json = r"C:\Users\jebapriya.jayapal\Downloads\pdf_output.json"
@@ -13,24 +13,25 @@ try:
     pdf_data = []
 
     # Process PDF
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
+    # Layout-preserving text is only available from pdfplumber
+    with open_pages(pdf_path, backend="pdfplumber") as pages:
+        for page in pages:
             page_dict = {
                 "page_number": page.page_number,
                 "width": page.width,
                 "height": page.height,
-                "text": page.extract_text(layout=True) or "",
+                "text": page.text(layout=True),
                 "chars": [
                     {
-                        "text": c.get("text", ""),
-                        "x0": round(c.get("x0", 0), 2),
-                        "y0": round(c.get("y0", 0), 2),
-                        "x1": round(c.get("x1", 0), 2),
-                        "y1": round(c.get("y1", 0), 2),
-                        "fontname": c.get("fontname", ""),
-                        "size": c.get("size", 0)
+                        "text": c["text"],
+                        "x0": round(c["x0"], 2),
+                        "y0": round(c["y0"], 2),
+                        "x1": round(c["x1"], 2),
+                        "y1": round(c["y1"], 2),
+                        "fontname": c["fontname"],
+                        "size": c["size"]
                     }
-                    for c in page.chars
+                    for c in page.chars()
                 ]
             }
             pdf_data.append(page_dict)
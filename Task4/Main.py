@@ -4,9 +4,11 @@ import logging
 import uvicorn
 from pathlib import Path
 import shutil
-import pdfplumber
+import hashlib
 import re
 import json
+from pdf_text import open_pages, resolve_backend
+from page_store import file_hash, locked_work_dir, cleanup_work_dirs, touch_entry, store_entry, evict_cache
 
 # ------------------ CONFIG SETUP ------------------
 app = FastAPI()
@@ -14,10 +16,21 @@ app = FastAPI()
 UPLOAD_DIR = Path("input")
 OUTPUT_DIR = Path("output")
 LOG_DIR = Path("logs")
+WORK_DIR = Path("work")
+PAGE_CACHE_DIR = Path("cache") / "pages"
+PAGE_CACHE_MAX_ENTRIES = 20000
+PAGE_CACHE_MAX_BYTES = 256 * 1024 ** 2
+PAGE_CACHE_VERSION = 2
+# PyMuPDF is faster but its text order and word boxes do not yet match the
+# committed output (see tests/test_pdf_text.py), so ICD extraction stays on pdfplumber
+ICD_TEXT_BACKEND = "pdfplumber"
+WORK_DIR_MAX_AGE = 7 * 24 * 3600
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR.mkdir(parents=True, exist_ok=True)
+WORK_DIR.mkdir(parents=True, exist_ok=True)
+PAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 logging.basicConfig(
     filename=LOG_DIR / "app.log",
@@ -47,15 +60,69 @@ def save_pdf_to_disk(file: UploadFile):
         logger.error(f"Error saving file: {e}", exc_info=True)
         return None, "Internal file save error"
 
+# ------------------ PAGE CACHE ------------------
+def page_cache_key(page_fingerprint: str):
+    # Cached results depend on the ICD pattern as well as on the page itself
+    return hashlib.sha256(f"v{PAGE_CACHE_VERSION}|{ICD_PATTERN}|{page_fingerprint}".encode()).hexdigest()
+
+def cache_lookup(cache_key: str):
+    # An entry evicted in the meantime is just a miss
+    cached = PAGE_CACHE_DIR / f"{cache_key}.json"
+    try:
+        with open(cached, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    touch_entry(cached)
+    return entry
+
+def cache_store(cache_key: str, page_result: dict):
+    entry = {k: v for k, v in page_result.items() if k != "page_number"}
+    store_entry(PAGE_CACHE_DIR, f"{cache_key}.json", json.dumps(entry).encode("utf-8"))
+
+# ------------------ PAGE CHECKPOINTS ------------------
+def load_checkpoint(work_dir: Path, page_number: int):
+    page_file = work_dir / f"page_{page_number:04d}.json"
+    if not page_file.exists():
+        return None
+    with open(page_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(work_dir: Path, page_number: int, page_result: dict):
+    page_file = work_dir / f"page_{page_number:04d}.json"
+    tmp_file = page_file.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(page_result, f)
+    # Rename last so a half-written page is never taken as finished
+    os.replace(tmp_file, page_file)
+
 # ------------------ EXTRACT ICD CODES & COORDINATES ------------------
-def extract_icd_codes(pdf_path: str):
+def extract_icd_codes(pdf_path: str, work_dir: Path = None, backend: str = None):
     results = []
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
+        # Words and text come in the same shape from either backend
+        backend = resolve_backend(backend, default=ICD_TEXT_BACKEND)
+        with open_pages(pdf_path, backend) as pages:
+            for page in pages:
+                if work_dir is not None:
+                    checkpoint = load_checkpoint(work_dir, page.page_number)
+                    if checkpoint is not None:
+                        results.append(checkpoint)
+                        continue
+
                 try:
-                    page_text = page.extract_text() or ""
+                    # Pages seen before in any document reuse the cached result
+                    cache_key = page_cache_key(page.fingerprint())
+                    cached = cache_lookup(cache_key)
+                    if cached is not None:
+                        page_result = {"page_number": page.page_number, **cached}
+                        if work_dir is not None:
+                            save_checkpoint(work_dir, page.page_number, page_result)
+                        results.append(page_result)
+                        continue
+
+                    page_text = page.text()
 
                     # Extract all ICD blocks
                     matches = re.findall(ICD_PATTERN, page_text, flags=re.IGNORECASE | re.MULTILINE)
@@ -70,7 +137,7 @@ def extract_icd_codes(pdf_path: str):
                     extracted_codes = list(dict.fromkeys(extracted_codes))  # preserves order
 
                     # Extract coordinates for each code
-                    words = page.extract_words(use_text_flow=True)
+                    words = page.words()
                     icd_coordinates = []
                     def normalize(text):
                         return re.sub(r"[^A-Z0-9\.]", "", text.upper())
@@ -88,11 +155,15 @@ def extract_icd_codes(pdf_path: str):
                                 "bottom": round(w["bottom"], 2)
                             })
 
-                    results.append({
+                    page_result = {
                         "page_number": page.page_number,
                         "icd_codes": icd_coordinates,  # all codes continuously with coordinates
                         "text": page_text.replace("\n", " ").strip()
-                    })
+                    }
+                    cache_store(cache_key, page_result)
+                    if work_dir is not None:
+                        save_checkpoint(work_dir, page.page_number, page_result)
+                    results.append(page_result)
 
                 except Exception as e:
                     logger.error(f"Page {page.page_number} extraction error: {e}", exc_info=True)
@@ -114,11 +185,21 @@ def background_process(pdf_path: str, json_path: str):
     try:
         output_file = Path(json_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
-        extracted_data = extract_icd_codes(pdf_path)
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(extracted_data, f, indent=4)
+        cleanup_work_dirs(WORK_DIR, WORK_DIR_MAX_AGE)
+
+        # Pages finished by an earlier attempt with the same backend are reused from the work dir
+        backend = resolve_backend(default=ICD_TEXT_BACKEND)
+        with locked_work_dir(WORK_DIR, f"{file_hash(pdf_path)}_{backend}") as work_dir:
+            extracted_data = extract_icd_codes(pdf_path, work_dir, backend)
+
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(extracted_data, f, indent=4)
+            evict_cache(PAGE_CACHE_DIR, PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_MAX_BYTES)
 
+            # Keep checkpoints around if any page failed so a retry only redoes those
+            if extracted_data and not any("error" in page for page in extracted_data):
+                shutil.rmtree(work_dir, ignore_errors=True)
         logger.info(f"Task completed successfully: {output_file}")
 
     except Exception as e:
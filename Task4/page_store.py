@@ -0,0 +1,164 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import logging
+from pathlib import Path
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# ------------------ WORK DIRS ------------------
+# Per-document directories holding page checkpoints, so a failed job can be
+# resumed. Used by app.py (OCRed page PDFs) and Task4/Main.py (page JSON).
+def file_hash(pdf_path: str):
+    sha = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def _lock(fd: int, blocking: bool):
+    # Both lock kinds belong to the open file, so the OS drops them when the holder dies
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(1)
+
+def _holds_current_file(fd: int, lock_file: Path):
+    try:
+        return os.path.samestat(os.fstat(fd), os.stat(lock_file))
+    except FileNotFoundError:
+        return False
+
+def acquire_lock(lock_file: Path, blocking: bool = True):
+    """Return an open fd holding lock_file, or None if another job holds it and blocking is off."""
+    while True:
+        fd = os.open(lock_file, os.O_CREAT | os.O_RDWR)
+        try:
+            locked = _lock(fd, blocking)
+        except BaseException:
+            os.close(fd)
+            raise
+        if not locked:
+            os.close(fd)
+            return None
+        # The job we waited for removed the file on release, so this lock guards nothing
+        if _holds_current_file(fd, lock_file):
+            return fd
+        os.close(fd)
+
+def release_lock(fd: int, lock_file: Path):
+    try:
+        lock_file.unlink(missing_ok=True)
+    except OSError:
+        pass  # Windows cannot remove an open file; the next job reuses it
+    os.close(fd)
+
+@contextmanager
+def locked_work_dir(work_root: Path, doc_key: str):
+    """Yield work_root/doc_key, held by one job at a time; a second job for the same key waits."""
+    work_dir = work_root / doc_key
+    lock_file = work_root / f"{doc_key}.lock"
+    fd = acquire_lock(lock_file)
+    try:
+        work_dir.mkdir(parents=True, exist_ok=True)
+        yield work_dir
+    finally:
+        release_lock(fd, lock_file)
+
+def cleanup_work_dirs(work_root: Path, max_age: float):
+    """Drop work dirs left behind by failed jobs once nobody has touched them for max_age seconds."""
+    now = time.time()
+    for work_dir in work_root.iterdir():
+        try:
+            if not work_dir.is_dir() or now - work_dir.stat().st_mtime <= max_age:
+                continue
+        except FileNotFoundError:
+            continue
+        lock_file = work_root / f"{work_dir.name}.lock"
+        fd = acquire_lock(lock_file, blocking=False)
+        if fd is None:
+            continue  # A job is still working on it
+        try:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            logger.info(f"Removed abandoned work dir: {work_dir}")
+        finally:
+            release_lock(fd, lock_file)
+    # Lock files of jobs that died before creating their work dir
+    for lock_file in work_root.glob("*.lock"):
+        if not (work_root / lock_file.stem).exists():
+            fd = acquire_lock(lock_file, blocking=False)
+            if fd is not None:
+                release_lock(fd, lock_file)
+
+# ------------------ PAGE CACHE ------------------
+# Results for pages seen before in any document, one file per page key, shared
+# by concurrent jobs and kept within a count and a byte limit
+CACHE_TMP_MAX_AGE = 3600
+
+def touch_entry(path: Path):
+    # Marks an entry as recently used for eviction; it may have been evicted already
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+def store_entry(cache_dir: Path, name: str, data: bytes):
+    # Unique temp names: shared boilerplate pages are often stored by two jobs at once
+    tmp_file = None
+    try:
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_file, cache_dir / name)
+    except OSError as e:
+        logger.warning(f"Page cache store failed: {e}")
+        if tmp_file is not None:
+            Path(tmp_file).unlink(missing_ok=True)
+
+def evict_cache(cache_dir: Path, max_entries: int, max_bytes: int):
+    """Remove least recently used entries until both the count and the size limit hold."""
+    now = time.time()
+    entries = []
+    for path in cache_dir.iterdir():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.suffix == ".tmp":
+            # Left behind by a job that died while storing an entry
+            if now - stat.st_mtime > CACHE_TMP_MAX_AGE:
+                path.unlink(missing_ok=True)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    count = len(entries)
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if count <= max_entries and total <= max_bytes:
+            break
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Page cache eviction failed: {e}")
+            continue
+        count -= 1
+        total -= size
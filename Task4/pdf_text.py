@@ -0,0 +1,305 @@
+import os
+import re
+import hashlib
+from contextlib import contextmanager
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pdfplumber
+    from pdfminer.psparser import PSLiteral
+    from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+except ImportError:
+    pdfplumber = None
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+# ------------------ BACKEND SELECTION ------------------
+# Fastest first. Precedence: backend argument, PDF_TEXT_BACKEND, the caller's
+# default, then the fastest one installed.
+BACKEND_PREFERENCE = ["pymupdf", "pdfplumber"]
+
+# ------------------ PAGE FINGERPRINTS ------------------
+# A page's fingerprint covers the page entries that decide how it looks and
+# everything they reach: content streams, fonts, images, graphics states and
+# annotations. Indirect objects are hashed once and referred to by visit order
+# afterwards, so a page matches itself in another file whatever its object
+# numbers are. Each backend tags its fingerprints with its own name.
+#
+# Bump when the fingerprint input changes so old cache entries stop matching
+FINGERPRINT_VERSION = 2
+# Page entries that decide how a page renders; the first four may be inherited
+PAGE_FINGERPRINT_KEYS = ["Resources", "MediaBox", "CropBox", "Rotate", "Contents", "Annots", "Group", "UserUnit"]
+INHERITABLE_PAGE_KEYS = {"Resources", "MediaBox", "CropBox", "Rotate"}
+# Back-references to the page tree would make every page of a document unique
+FINGERPRINT_SKIP_KEYS = {"Parent", "P"}
+# Inherited entries are looked up at most this many levels up; page trees with cycles exist
+MAX_PAGE_TREE_DEPTH = 64
+
+def _hash_field(sha, tag: bytes, data: bytes):
+    # Length-prefixed so adjacent fields can never run into each other
+    sha.update(tag + len(data).to_bytes(8, "big") + data)
+
+def _new_fingerprint(backend: str):
+    sha = hashlib.sha256()
+    _hash_field(sha, b"G", f"v{FINGERPRINT_VERSION}|{backend}".encode())
+    return sha
+
+def available_backends():
+    installed = {"pymupdf": fitz is not None, "pdfplumber": pdfplumber is not None}
+    return [name for name in BACKEND_PREFERENCE if installed[name]]
+
+def resolve_backend(backend: str = None, default: str = None):
+    backends = available_backends()
+    backend = (backend or os.environ.get("PDF_TEXT_BACKEND") or default or "").lower()
+    if not backend:
+        if not backends:
+            raise RuntimeError("No PDF text backend installed (need PyMuPDF or pdfplumber)")
+        return backends[0]
+    if backend not in BACKEND_PREFERENCE:
+        raise ValueError(f"Unknown PDF text backend: {backend}")
+    if backend not in backends:
+        raise RuntimeError(f"PDF text backend not installed: {backend}")
+    return backend
+
+# ------------------ PDFPLUMBER PAGES ------------------
+class PlumberPage:
+    def __init__(self, page, stream_digests: dict = None):
+        self._page = page
+        # Shared by all pages of one document, see _hash_stream
+        self._stream_digests = {} if stream_digests is None else stream_digests
+        self.page_number = page.page_number
+        self.width = page.width
+        self.height = page.height
+
+    def text(self, layout: bool = False):
+        return self._page.extract_text(layout=layout) or ""
+
+    def words(self):
+        return [
+            {"text": w["text"], "x0": w["x0"], "x1": w["x1"], "top": w["top"], "bottom": w["bottom"]}
+            for w in self._page.extract_words(use_text_flow=True)
+        ]
+
+    def chars(self):
+        return [
+            {
+                "text": c.get("text", ""),
+                "x0": c.get("x0", 0),
+                "y0": c.get("y0", 0),
+                "x1": c.get("x1", 0),
+                "y1": c.get("y1", 0),
+                "fontname": c.get("fontname", ""),
+                "size": c.get("size", 0)
+            }
+            for c in self._page.chars
+        ]
+
+    def fingerprint(self):
+        # pdfminer has already merged inherited entries into attrs
+        attrs = self._page.page_obj.attrs
+        sha = _new_fingerprint("pdfplumber")
+        seen = {}
+        for key in PAGE_FINGERPRINT_KEYS:
+            _hash_field(sha, b"K", key.encode())
+            self._hash_object(sha, attrs.get(key), seen)
+        return sha.hexdigest()
+
+    def _hash_object(self, sha, obj, seen):
+        if isinstance(obj, PDFObjRef):
+            if obj.objid in seen:
+                _hash_field(sha, b"R", str(seen[obj.objid]).encode())
+                return
+            seen[obj.objid] = len(seen)
+            obj = resolve1(obj)
+        if isinstance(obj, PDFStream):
+            _hash_field(sha, b"S", self._hash_stream(obj))
+            obj = obj.attrs
+        if isinstance(obj, dict):
+            keys = sorted(k for k in obj if k not in FINGERPRINT_SKIP_KEYS)
+            _hash_field(sha, b"D", str(len(keys)).encode())
+            for key in keys:
+                _hash_field(sha, b"K", str(key).encode())
+                self._hash_object(sha, obj[key], seen)
+        elif isinstance(obj, list):
+            _hash_field(sha, b"A", str(len(obj)).encode())
+            for item in obj:
+                self._hash_object(sha, item, seen)
+        elif isinstance(obj, PSLiteral):
+            name = obj.name
+            _hash_field(sha, b"N", name if isinstance(name, bytes) else name.encode())
+        elif isinstance(obj, bytes):
+            _hash_field(sha, b"T", obj)
+        else:
+            _hash_field(sha, b"V", repr(obj).encode())  # numbers, booleans, null
+
+    def _hash_stream(self, stream):
+        # Raw bytes are hashed because decoding scanned images in pdfminer is slow.
+        # pdfminer drops them once a page using the stream is parsed, so digests are
+        # kept per document; a stream decoded before it was hashed falls back to its
+        # decoded data under a different tag.
+        key = id(stream)
+        if key not in self._stream_digests:
+            raw = stream.get_rawdata()
+            if raw is not None:
+                digest = b"raw:" + hashlib.sha256(raw).digest()
+            else:
+                digest = b"decoded:" + hashlib.sha256(stream.get_data() or b"").digest()
+            self._stream_digests[key] = digest
+        return self._stream_digests[key]
+
+# ------------------ PYMUPDF PAGES ------------------
+class PyMuPDFPage:
+    def __init__(self, page):
+        self._page = page
+        self.page_number = page.number + 1
+        self.width = page.rect.width
+        self.height = page.rect.height
+
+    def text(self, layout: bool = False):
+        if layout:
+            raise ValueError('PyMuPDF has no layout-preserving text mode; use backend="pdfplumber"')
+        return self._page.get_text("text") or ""
+
+    def words(self):
+        return [
+            {"text": w[4], "x0": w[0], "x1": w[2], "top": w[1], "bottom": w[3]}
+            for w in self._page.get_text("words")
+        ]
+
+    def chars(self):
+        # Spans drop the subset prefix pdfplumber keeps ("ODTQIZ+Arial"); it is put
+        # back when only one embedded font on the page has that name
+        basefonts = {}
+        for font in self._page.get_fonts():
+            basefonts.setdefault(font[3].split("+", 1)[-1], set()).add(font[3])
+        fontnames = {name: fonts.pop() for name, fonts in basefonts.items() if len(fonts) == 1}
+
+        # pdfplumber's y0/y1 are measured from the bottom of the page
+        chars = []
+        for block in self._page.get_text("rawdict")["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    for c in span["chars"]:
+                        x0, top, x1, bottom = c["bbox"]
+                        chars.append({
+                            "text": c["c"],
+                            "x0": x0,
+                            "y0": self.height - bottom,
+                            "x1": x1,
+                            "y1": self.height - top,
+                            "fontname": fontnames.get(span["font"], span["font"]),
+                            "size": span["size"]
+                        })
+        return chars
+
+    # "12 0 R" references and the back-references skipped in every fingerprint
+    _REF = re.compile(r"(\d+) \d+ R")
+    _SKIPPED_REF = re.compile(r"/(?:Parent|P)\s+\d+\s+\d+\s+R")
+
+    def fingerprint(self):
+        # Objects are read as source text, since PyMuPDF has no object model to walk
+        page = self._page
+        sha = _new_fingerprint("pymupdf")
+        seen = {}
+        for key in PAGE_FINGERPRINT_KEYS:
+            _hash_field(sha, b"K", key.encode())
+            self._hash_source(sha, self._inherited_value(page.xref, key), seen)
+        return sha.hexdigest()
+
+    def _inherited_value(self, xref: int, key: str):
+        doc = self._page.parent
+        for _ in range(MAX_PAGE_TREE_DEPTH):
+            kind, value = doc.xref_get_key(xref, key)
+            if kind != "null":
+                return value
+            kind, parent = doc.xref_get_key(xref, "Parent")
+            if key not in INHERITABLE_PAGE_KEYS or kind != "xref":
+                return "null"
+            xref = int(parent.split()[0])
+        return "null"
+
+    def _hash_source(self, sha, source: str, seen):
+        # Object numbers differ between files, so references are hashed by what they point at
+        source = self._SKIPPED_REF.sub("", source)
+        _hash_field(sha, b"O", self._REF.sub("R", source).encode())
+        for match in self._REF.finditer(source):
+            self._hash_xref(sha, int(match.group(1)), seen)
+
+    def _hash_xref(self, sha, xref: int, seen):
+        if xref in seen:
+            _hash_field(sha, b"R", str(seen[xref]).encode())
+            return
+        seen[xref] = len(seen)
+        doc = self._page.parent
+        if doc.xref_is_stream(xref):
+            _hash_field(sha, b"S", doc.xref_stream_raw(xref) or b"")
+        self._hash_source(sha, doc.xref_object(xref, compressed=True), seen)
+
+# ------------------ PIKEPDF PAGES ------------------
+# app.py splits documents with pikepdf, so it fingerprints the pages it already
+# has open instead of parsing the file again with a text backend
+def pikepdf_fingerprint(page):
+    sha = _new_fingerprint("pikepdf")
+    seen = {}
+    for key in PAGE_FINGERPRINT_KEYS:
+        _hash_field(sha, b"K", key.encode())
+        _hash_pikepdf_object(sha, _pikepdf_inherited_value(page.obj, "/" + key), seen)
+    return sha.hexdigest()
+
+def _pikepdf_inherited_value(page_obj, key: str):
+    node = page_obj
+    for _ in range(MAX_PAGE_TREE_DEPTH):
+        if key in node:
+            return node[key]
+        if key[1:] not in INHERITABLE_PAGE_KEYS or "/Parent" not in node:
+            return None
+        node = node["/Parent"]
+    return None
+
+def _hash_pikepdf_object(sha, obj, seen):
+    if isinstance(obj, pikepdf.Object) and obj.is_indirect:
+        if obj.objgen in seen:
+            _hash_field(sha, b"R", str(seen[obj.objgen]).encode())
+            return
+        seen[obj.objgen] = len(seen)
+    if isinstance(obj, pikepdf.Stream):
+        _hash_field(sha, b"S", obj.read_raw_bytes())
+    if isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream)):
+        keys = sorted(k for k in obj.keys() if k[1:] not in FINGERPRINT_SKIP_KEYS)
+        _hash_field(sha, b"D", str(len(keys)).encode())
+        for key in keys:
+            _hash_field(sha, b"K", key[1:].encode())
+            _hash_pikepdf_object(sha, obj[key], seen)
+    elif isinstance(obj, pikepdf.Array):
+        _hash_field(sha, b"A", str(len(obj)).encode())
+        for item in obj:
+            _hash_pikepdf_object(sha, item, seen)
+    elif isinstance(obj, pikepdf.Name):
+        _hash_field(sha, b"N", str(obj)[1:].encode())
+    elif isinstance(obj, pikepdf.String):
+        _hash_field(sha, b"T", bytes(obj))
+    else:
+        _hash_field(sha, b"V", repr(obj).encode())
+
+# ------------------ OPEN PDF ------------------
+@contextmanager
+def open_pages(pdf_path: str, backend: str = None, default: str = None):
+    """Yield the pages of pdf_path as PlumberPage or PyMuPDFPage objects."""
+    backend = resolve_backend(backend, default)
+    if backend == "pymupdf":
+        doc = fitz.open(pdf_path)
+        try:
+            yield (PyMuPDFPage(page) for page in doc)
+        finally:
+            doc.close()
+    else:
+        with pdfplumber.open(pdf_path) as pdf:
+            stream_digests = {}
+            yield (PlumberPage(page, stream_digests) for page in pdf.pages)
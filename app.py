@@ -1,11 +1,17 @@
 from flask import Flask, request, jsonify, send_file
 import os
 import shutil
+import hashlib
 import logging
+import multiprocessing
 import warnings
 from pathlib import Path
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 import ocrmypdf
 import pikepdf
+from Task4.page_store import file_hash, locked_work_dir, cleanup_work_dirs, touch_entry, store_entry, evict_cache
+from Task4.pdf_text import pikepdf_fingerprint
  
 warnings.filterwarnings("ignore")
  
@@ -15,13 +21,43 @@ app = Flask(__name__)
 UPLOAD_DIR = Path("input")
 OUTPUT_DIR = Path("output")
 LOG_DIR = Path("logs")
+WORK_DIR = Path("work")
+PAGE_CACHE_DIR = Path("cache") / "pages"
  
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR.mkdir(parents=True, exist_ok=True)
+WORK_DIR.mkdir(parents=True, exist_ok=True)
+PAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 ocrmypdf.configure_logging(verbosity=0)
 ROTATE_THRESHOLD = 5.0
 OCR_JOBS = 4
+PAGE_CACHE_MAX_ENTRIES = 5000
+PAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+WORK_DIR_MAX_AGE = 7 * 24 * 3600
+MERGE_BATCH_PAGES = 100
+ 
+# Per-page OCR settings; they are also part of the page cache key
+PAGE_OCR_OPTIONS = dict(
+    language="eng",
+    force_ocr=True,
+    skip_text=False,
+    rotate_pages=True,
+    rotate_pages_threshold=ROTATE_THRESHOLD,
+    deskew=True,
+    optimize=0,
+    jobs=1,
+    redo_ocr=False,
+    oversample=300,
+    output_type="pdf",  # PDF/A conversion runs once on the merged document
+    progress_bar=False,
+    verbose=0,
+)
+PAGE_CACHE_VERSION = 2
+PAGE_CACHE_TAG = f"v{PAGE_CACHE_VERSION}|ocrmypdf {ocrmypdf.__version__}|{sorted(PAGE_OCR_OPTIONS.items())}"
+ 
+# Shared by all requests; spawned rather than forked because the Flask server is threaded
+OCR_POOL = ProcessPoolExecutor(max_workers=OCR_JOBS, mp_context=multiprocessing.get_context("spawn"))
  
 # ------------------------------------ Logging ---------------------------
 logging.basicConfig(
@@ -73,6 +109,84 @@ def is_signed_pdf(pdf_path):
         logging.warning(f"Signature check failed: {e}")
         return False
  
+# ------------------------------ Page cache -----------------------------
+def page_cache_key(page):
+    # Cached pages depend on the OCR settings as well as on the page itself
+    return hashlib.sha256(f"{PAGE_CACHE_TAG}|{pikepdf_fingerprint(page)}".encode()).hexdigest()
+ 
+def cache_fetch(cache_key, dst):
+    # Copies a cached page to dst; an entry evicted in the meantime is just a miss
+    cached = PAGE_CACHE_DIR / f"{cache_key}.pdf"
+    tmp_path = dst.with_suffix(".tmp")
+    try:
+        shutil.copy(cached, tmp_path)
+    except FileNotFoundError:
+        return False
+    touch_entry(cached)
+    os.replace(tmp_path, dst)
+    return True
+ 
+def cache_store(cache_key, ocr_pdf_path):
+    store_entry(PAGE_CACHE_DIR, f"{cache_key}.pdf", ocr_pdf_path.read_bytes())
+ 
+# ------------------------------ Checkpoints -----------------------------
+def split_pages(input_pdf, work_dir):
+    # One single-page PDF per source page, written once per document
+    page_paths = []
+    cache_keys = []
+    with pikepdf.open(input_pdf) as pdf:
+        for i, page in enumerate(pdf.pages, start=1):
+            cache_keys.append(page_cache_key(page))
+            page_path = work_dir / f"page_{i:04d}.pdf"
+            if not page_path.exists():
+                single = pikepdf.new()
+                single.pages.append(page)
+                tmp_path = page_path.with_suffix(".tmp")
+                single.save(tmp_path)
+                os.replace(tmp_path, page_path)
+            page_paths.append(page_path)
+    return page_paths, cache_keys
+ 
+def ocr_page(page_pdf, ocr_pdf_path):
+    tmp_path = ocr_pdf_path.with_suffix(".tmp")
+    ocrmypdf.ocr(page_pdf, tmp_path, **PAGE_OCR_OPTIONS)
+    # Rename last so a half-written page is never taken as finished
+    os.replace(tmp_path, ocr_pdf_path)
+    return ocr_pdf_path
+ 
+def merge_pages(input_pdf, page_paths, merged_pdf):
+    # OCRed pages are swapped into the source page objects in place, so the outline,
+    # AcroForm, metadata and page labels of the original document keep pointing at them.
+    # Copied stream data is only read from the page files on save, so pages are merged
+    # in batches to keep the number of open files bounded.
+    source = input_pdf
+    for start in range(0, len(page_paths), MERGE_BATCH_PAGES):
+        batch_pdf = merged_pdf.with_name(f"merged_{start:04d}.pdf")
+        with pikepdf.open(source) as pdf, ExitStack() as stack:
+            for i in range(start, min(start + MERGE_BATCH_PAGES, len(page_paths))):
+                ocr_doc = stack.enter_context(pikepdf.open(page_paths[i]))
+                pdf.pages.append(ocr_doc.pages[0])
+                pdf.pages[i].emplace(pdf.pages[-1], retain=(pikepdf.Name.Parent, pikepdf.Name.Annots))
+                del pdf.pages[-1]
+            pdf.save(batch_pdf)
+        if source != input_pdf:
+            os.remove(source)
+        source = batch_pdf
+    os.replace(source, merged_pdf)
+ 
+def finish_pdf(merged_pdf, output_pdf):
+    # Every page already has text, so this only does the PDF/A conversion
+    ocrmypdf.ocr(
+        merged_pdf,
+        output_pdf,
+        skip_text=True,
+        output_type="pdfa",
+        optimize=0,
+        jobs=OCR_JOBS,
+        progress_bar=False,
+        verbose=0,
+    )
+ 
 # ------------------- OCR -------------------
 def process_pdf(input_pdf, output_pdf):
     logging.info(f"Processing started: {input_pdf}")
@@ -90,32 +204,39 @@ def process_pdf(input_pdf, output_pdf):
             shutil.copy(input_pdf, output_pdf)
             return "signed_pdf"
  
-        # Normal OCR processing
-        ocrmypdf.ocr(
-            input_pdf,
-            output_pdf,
-            language="eng",
-            force_ocr=True,
-            skip_text=False,
-            rotate_pages=True,
-            rotate_pages_threshold=ROTATE_THRESHOLD,
-            deskew=True,
-            optimize=0,
-            jobs=OCR_JOBS,
-            redo_ocr=False,
-            oversample=300,
-            progress_bar=False,
-            verbose=0,
-        )
+        cleanup_work_dirs(WORK_DIR, WORK_DIR_MAX_AGE)
+ 
+        # Pages already OCRed by an earlier attempt are picked up from the work dir
+        with locked_work_dir(WORK_DIR, file_hash(input_pdf)) as work_dir:
+            page_paths, cache_keys = split_pages(input_pdf, work_dir)
+            ocr_paths = [p.with_name(f"ocr_{p.name}") for p in page_paths]
+ 
+            pending = [(src, dst) for src, dst in zip(page_paths, ocr_paths) if not dst.exists()]
+            if len(pending) < len(page_paths):
+                logging.info(f"Resuming from checkpoint: {len(page_paths) - len(pending)}/{len(page_paths)} pages done")
+ 
+            # Pages seen before in any document are copied from the cache instead of OCRed
+            cache_key_of = dict(zip(ocr_paths, cache_keys))
+            to_ocr = []
+            for src, dst in pending:
+                if not cache_fetch(cache_key_of[dst], dst):
+                    to_ocr.append((src, dst))
+            logging.info(f"Page cache hits: {len(pending) - len(to_ocr)}/{len(pending)}")
+ 
+            if to_ocr:
+                for done in OCR_POOL.map(ocr_page, *zip(*to_ocr)):
+                    cache_store(cache_key_of[done], done)
+                    logging.info(f"Page checkpoint saved: {done}")
+                evict_cache(PAGE_CACHE_DIR, PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_MAX_BYTES)
+ 
+            merged_pdf = work_dir / "merged.pdf"
+            merge_pages(input_pdf, ocr_paths, merged_pdf)
+            finish_pdf(merged_pdf, output_pdf)
+            shutil.rmtree(work_dir, ignore_errors=True)
         logging.info(f"OCR completed: {output_pdf}")
         print(f"OCR process completed.")
         return "ocr_applied"
  
-    except ocrmypdf.exceptions.PriorOcrFoundError:
-        logging.warning("OCR already exists, copying input to output")
-        os.replace(input_pdf, output_pdf)
-        return "already_ocr"
- 
     except Exception as e:
         logging.error(f"OCR failed: {e}")
         raise
@@ -0,0 +1,333 @@
+import os
+import sys
+import io
+import json
+import math
+import time
+import uuid
+import argparse
+import threading
+import importlib
+import urllib.request
+import urllib.error
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------ CONFIG ------------------
+REPO_DIR = Path(__file__).resolve().parent
+
+# name -> app file, upload route, and the host/port the app's __main__ block binds
+TARGETS = {
+    "ocr": {"app": REPO_DIR / "app.py", "route": "/ocr", "host": "172.17.200.196", "port": 9890},
+    "rotate": {"app": REPO_DIR / "Rotate" / "try.py", "route": "/process-pdf/", "host": "127.0.0.1", "port": 9880},
+    "icd": {"app": REPO_DIR / "Task4" / "Main.py", "route": "/upload-pdf/", "host": "127.0.0.1", "port": 8450},
+}
+
+DEFAULT_CORPUS = [
+    REPO_DIR / "Rotate" / "input",
+    REPO_DIR / "Task4" / "Input",
+    REPO_DIR / "ocr",
+]
+
+SAMPLE_INTERVAL = 0.5  # seconds between queue samples
+
+# ------------------ CORPUS ------------------
+def load_corpus(paths):
+    corpus = []
+    for path in map(Path, paths):
+        files = sorted(path.rglob("*.pdf")) if path.is_dir() else [path]
+        for pdf in files:
+            corpus.append((pdf.name, pdf.read_bytes()))
+    if not corpus:
+        raise FileNotFoundError(f"No PDF files found in: {', '.join(map(str, paths))}")
+    return corpus
+
+# ------------------ CLIENTS ------------------
+class HttpClient:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def post_pdf(self, route: str, filename: str, data: bytes):
+        boundary = uuid.uuid4().hex
+        body = b"".join([
+            f"--{boundary}\r\n".encode(),
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode(),
+            b"Content-Type: application/pdf\r\n\r\n",
+            data,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        req = urllib.request.Request(
+            self.base_url + route,
+            data=body,
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+class InProcessClient:
+    """Calls the app through Flask's test client or FastAPI's TestClient.
+
+    Not usable for icd: TestClient runs BackgroundTasks before returning, so the
+    job queue never builds up and latency would include the whole extraction.
+    """
+
+    def __init__(self, app_file: Path, run_dir: Path = None):
+        self.app_dir = app_file.parent
+        # The apps create input/output/logs relative to the working directory
+        os.chdir(run_dir or self.app_dir)
+        sys.path.insert(0, str(self.app_dir))
+        # Imported under its own name: app.py's process pool pickles functions by module name
+        module = importlib.import_module(app_file.stem)
+        self.app = module.app
+        self.is_flask = hasattr(self.app, "test_client")
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            if self.is_flask:
+                self._local.client = self.app.test_client()
+            else:
+                from fastapi.testclient import TestClient
+                self._local.client = TestClient(self.app)
+        return self._local.client
+
+    def post_pdf(self, route: str, filename: str, data: bytes):
+        client = self._client()
+        if self.is_flask:
+            resp = client.post(
+                route,
+                data={"file": (io.BytesIO(data), filename)},
+                content_type="multipart/form-data",
+            )
+            return resp.status_code, resp.get_data()
+        resp = client.post(route, files={"file": (filename, data, "application/pdf")})
+        return resp.status_code, resp.content
+
+# ------------------ LOAD RUN ------------------
+def is_success(target: str, status: int, body: bytes):
+    if status >= 400:
+        return False
+    if target == "icd":
+        # /upload-pdf/ reports validation errors with HTTP 200
+        try:
+            return json.loads(body).get("status") == "queued"
+        except ValueError:
+            return False
+    return True
+
+def percentile(sorted_values, pct):
+    # Nearest-rank: the smallest value with at least pct% of the samples at or below it
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+def run_load(target, client, corpus, total, rate, concurrency, server_dir):
+    route = TARGETS[target]["route"]
+    results = []
+    pending_jobs = []  # icd output files not written yet
+    state = {"submitted": 0, "started": 0, "finished": 0}
+    lock = threading.Lock()
+    samples = []
+    done = threading.Event()
+
+    def send(index, scheduled=None):
+        name, data = corpus[index % len(corpus)]
+        # Unique names so concurrent uploads of one sample do not overwrite each other
+        filename = f"lt{index:05d}_{name}"
+        with lock:
+            state["started"] += 1
+        start = time.perf_counter()
+        if scheduled is None:
+            scheduled = start
+        try:
+            status, body = client.post_pdf(route, filename, data)
+            error = None
+        except Exception as e:
+            status, body, error = 0, b"", str(e)
+        end = time.perf_counter()
+        ok = error is None and is_success(target, status, body)
+        if ok and target == "icd":
+            output_json = json.loads(body)["output_json"]
+            with lock:
+                pending_jobs.append(server_dir / output_json)
+        with lock:
+            state["finished"] += 1
+            results.append({
+                "index": index,
+                "file": name,
+                "status": status,
+                "ok": ok,
+                # From the scheduled arrival, so time spent waiting for a free worker counts
+                "latency_ms": round((end - scheduled) * 1000, 2),
+                "service_ms": round((end - start) * 1000, 2),
+                "error": error if error else (None if ok else body[:200].decode("utf-8", "replace")),
+            })
+
+    def sample(t0):
+        while not done.wait(SAMPLE_INTERVAL):
+            with lock:
+                server_pending = sum(1 for p in pending_jobs if not p.exists())
+                samples.append({
+                    "t": round(time.perf_counter() - t0, 2),
+                    "waiting": state["submitted"] - state["started"],
+                    "in_flight": state["started"] - state["finished"],
+                    "server_pending": server_pending,
+                })
+
+    t0 = time.perf_counter()
+    sampler = threading.Thread(target=sample, args=(t0,), daemon=True)
+    sampler.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if rate:
+            for index in range(total):
+                # Open-loop schedule: requests keep arriving even if the server falls behind
+                scheduled = t0 + index / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with lock:
+                    state["submitted"] += 1
+                pool.submit(send, index, scheduled)
+        else:
+            # Closed loop: each worker sends its next request once the previous one returns
+            indices = iter(range(total))
+
+            def worker():
+                while True:
+                    with lock:
+                        index = next(indices, None)
+                        if index is None:
+                            return
+                        state["submitted"] += 1
+                    send(index)
+
+            for _ in range(concurrency):
+                pool.submit(worker)
+    elapsed = time.perf_counter() - t0
+    done.set()
+    sampler.join()
+
+    return results, samples, pending_jobs, elapsed
+
+def wait_for_drain(pending_jobs, timeout):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if all(p.exists() for p in pending_jobs):
+            return round(time.perf_counter() - start, 2)
+        time.sleep(SAMPLE_INTERVAL)
+    return None
+
+# ------------------ REPORT ------------------
+def summarize(values):
+    values = sorted(values)
+    return {
+        "min": values[0] if values else None,
+        "mean": round(sum(values) / len(values), 2) if values else None,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else None,
+    }
+
+def build_report(args, results, samples, pending_jobs, elapsed, drain_seconds):
+    errors = [r for r in results if not r["ok"]]
+    status_codes = {}
+    for r in results:
+        status_codes[str(r["status"])] = status_codes.get(str(r["status"]), 0) + 1
+
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "target": args.target,
+        "mode": args.mode,
+        "config": {
+            "requests": args.requests,
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "corpus": [str(p) for p in args.corpus],
+        },
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        "requests": len(results),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(results), 4) if results else None,
+        "status_codes": status_codes,
+        # latency: scheduled arrival to response (equal to service time when rate is 0);
+        # service time: request sent to response
+        "latency_ms": summarize(r["latency_ms"] for r in results),
+        "service_time_ms": summarize(r["service_ms"] for r in results),
+        "queue": {
+            "max_waiting": max((s["waiting"] for s in samples), default=0),
+            "max_in_flight": max((s["in_flight"] for s in samples), default=0),
+            "max_server_pending": max((s["server_pending"] for s in samples), default=0),
+            "server_pending_at_end": sum(1 for p in pending_jobs if not p.exists()),
+            "drain_s": drain_seconds,
+            "samples": samples,
+        },
+        "error_samples": errors[:10],
+    }
+
+# ------------------ MAIN ------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay sample PDFs against the upload endpoints.")
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("--mode", choices=["http", "inprocess"], default="http",
+                        help="http: send to a running server; inprocess: import the app and use its test client "
+                             "(ocr and rotate only)")
+    parser.add_argument("--base-url",
+                        help="Server URL for http mode. Defaults to the address each app binds: "
+                             "http://172.17.200.196:9890 for ocr (app.py does not listen on localhost), "
+                             "http://127.0.0.1:9880 for rotate and http://127.0.0.1:8450 for icd")
+    parser.add_argument("--requests", type=int, default=50, help="Total requests to send")
+    parser.add_argument("--rate", type=float, default=0, help="Requests per second. 0 runs a closed loop instead: each of --concurrency "
+                             "workers sends its next request as soon as the previous one returns")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-request timeout in seconds (http mode)")
+    parser.add_argument("--corpus", nargs="+", type=Path, default=DEFAULT_CORPUS,
+                        help="PDF files or directories to replay")
+    parser.add_argument("--server-dir", type=Path,
+                        help="Working directory of the icd server, used to watch its output JSON files")
+    parser.add_argument("--drain-timeout", type=float, default=0,
+                        help="Seconds to wait for queued icd jobs to finish after the last request")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.mode == "inprocess" and args.target == "icd":
+        parser.error("--mode inprocess cannot measure the icd queue: FastAPI's TestClient runs "
+                     "background tasks before returning. Start Task4/Main.py and use --mode http")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    target = TARGETS[args.target]
+    corpus = load_corpus(args.corpus)
+    server_dir = (args.server_dir or target["app"].parent).resolve()
+    output = args.output.resolve() if args.output else None
+
+    if args.mode == "inprocess":
+        client = InProcessClient(target["app"])
+    else:
+        client = HttpClient(args.base_url or f"http://{target['host']}:{target['port']}", args.timeout)
+
+    results, samples, pending_jobs, elapsed = run_load(
+        args.target, client, corpus, args.requests, args.rate, args.concurrency, server_dir
+    )
+    drain_seconds = wait_for_drain(pending_jobs, args.drain_timeout) if args.drain_timeout else None
+    report = build_report(args, results, samples, pending_jobs, elapsed, drain_seconds)
+
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Report saved: {output}")
+    else:
+        print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
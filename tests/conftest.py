@@ -0,0 +1,76 @@
+import os
+import sys
+import importlib
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(REPO_DIR / "Task4"))
+
+def import_app(module_name, tmp_path_factory):
+    # The apps create input/output/logs next to the working directory on import
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp(module_name))
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        os.chdir(cwd)
+
+@pytest.fixture(scope="session")
+def icd_module(tmp_path_factory):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("uvicorn")
+    pytest.importorskip("pdfplumber")
+    return import_app("Main", tmp_path_factory)
+
+@pytest.fixture
+def icd_main(icd_module, tmp_path, monkeypatch):
+    # Fresh cache and work dirs for every test
+    for name in ("PAGE_CACHE_DIR", "WORK_DIR"):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setattr(icd_module, name, path)
+    return icd_module
+
+@pytest.fixture(scope="session")
+def ocr_app(tmp_path_factory):
+    pytest.importorskip("flask")
+    pytest.importorskip("ocrmypdf")
+    pytest.importorskip("pikepdf")
+    return import_app("app", tmp_path_factory)
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Write a one-page PDF showing `text` in Helvetica with the given /Encoding."""
+
+    def make(name, text, encoding="/WinAnsiEncoding", padding=0):
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        # Unused leading objects shift every object number without changing the page
+        objects = [b"<< >>"] * padding
+        first = padding + 1
+        objects += [
+            f"<< /Type /Catalog /Pages {first + 1} 0 R >>".encode(),
+            f"<< /Type /Pages /Kids [{first + 2} 0 R] /Count 1 >>".encode(),
+            (
+                f"<< /Type /Page /Parent {first + 1} 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 {first + 3} 0 R >> >> /Contents {first + 4} 0 R >>"
+            ).encode(),
+            f"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding {encoding} >>".encode(),
+            b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        ]
+        out = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+        out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, first, xref)
+        path = tmp_path / name
+        path.write_bytes(bytes(out))
+        return str(path)
+
+    return make
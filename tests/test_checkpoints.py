@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import REPO_DIR
+from page_store import locked_work_dir, cleanup_work_dirs
+
+# Takes the lock on work/doc and dies without releasing it
+CRASHING_JOB = """
+import os, sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+from page_store import locked_work_dir
+with locked_work_dir(Path(sys.argv[2]), "doc"):
+    os._exit(1)
+"""
+
+def crash_while_locked(work_root):
+    subprocess.run([sys.executable, "-c", CRASHING_JOB, str(REPO_DIR / "Task4"), str(work_root)], timeout=60)
+
+def test_lock_of_a_crashed_job_is_released(tmp_path):
+    crash_while_locked(tmp_path)
+    assert (tmp_path / "doc.lock").exists()
+
+    start = time.monotonic()
+    with locked_work_dir(tmp_path, "doc") as work_dir:
+        assert time.monotonic() - start < 5
+        assert work_dir == tmp_path / "doc"
+    assert not (tmp_path / "doc.lock").exists()
+
+def test_cleanup_skips_work_dirs_in_use(tmp_path):
+    old = time.time() - 3600
+    with locked_work_dir(tmp_path, "busy") as busy_dir:
+        crash_while_locked(tmp_path)
+        for work_dir in (busy_dir, tmp_path / "doc"):
+            os.utime(work_dir, (old, old))
+
+        cleanup_work_dirs(tmp_path, max_age=60)
+
+        assert busy_dir.exists()
+        assert not (tmp_path / "doc").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["busy"]
+
+SAMPLE_PDF = str(REPO_DIR / "Task4" / "Input" / "AI_11_ISC_2 1.pdf")
+SAMPLE_JSON = REPO_DIR / "Task4" / "Output" / "AI_11_ISC_2 1.json"
+
+def test_icd_job_resumes_from_first_unfinished_page(icd_main, tmp_path, monkeypatch):
+    monkeypatch.delenv("PDF_TEXT_BACKEND", raising=False)
+    output_json = tmp_path / "out.json"
+    cache_store = icd_main.cache_store
+
+    def killed_on_page_5(cache_key, page_result):
+        if page_result["page_number"] == 5:
+            raise SystemExit("worker killed")
+        cache_store(cache_key, page_result)
+
+    monkeypatch.setattr(icd_main, "cache_store", killed_on_page_5)
+    with pytest.raises(SystemExit):
+        icd_main.background_process(SAMPLE_PDF, str(output_json))
+    # Without the cache, pages 1-4 can only come back from their checkpoints
+    shutil.rmtree(icd_main.PAGE_CACHE_DIR)
+    icd_main.PAGE_CACHE_DIR.mkdir()
+
+    extracted = []
+    monkeypatch.setattr(icd_main, "cache_store", lambda key, result: extracted.append(result["page_number"]))
+    icd_main.background_process(SAMPLE_PDF, str(output_json))
+
+    assert extracted == list(range(5, 13))
+    with open(output_json, encoding="utf-8") as f, open(SAMPLE_JSON, encoding="utf-8") as g:
+        assert json.load(f) == json.load(g)
+    assert list(icd_main.WORK_DIR.iterdir()) == []
+
+def make_document(path):
+    import pikepdf
+
+    pdf = pikepdf.new()
+    for number in range(1, 4):
+        pdf.add_blank_page(page_size=(612, 792))
+        pdf.pages[-1].Contents = pdf.make_stream(f"BT /F1 12 Tf 72 720 Td (Page {number}) Tj ET".encode())
+    pdf.pages[1].Rotate = 90
+    pdf.Root.PageLabels = pikepdf.Dictionary(Nums=[0, pikepdf.Dictionary(S=pikepdf.Name.r)])
+    with pdf.open_outline() as outline:
+        outline.root.append(pikepdf.OutlineItem("Second page", 1))
+    pdf.docinfo["/Title"] = "Resume test"
+    pdf.save(path)
+
+def fake_ocr_page(run, ocred, fail_on=None):
+    import pikepdf
+
+    # Marks each page with the run that "OCRed" it
+    def ocr_page(page_pdf, ocr_pdf_path):
+        if page_pdf.name == fail_on:
+            raise RuntimeError("tesseract died")
+        ocred.append(page_pdf.name)
+        with pikepdf.open(page_pdf) as pdf:
+            pdf.pages[0].obj.OCRRun = run
+            pdf.save(ocr_pdf_path)
+        return ocr_pdf_path
+    return ocr_page
+
+def test_ocr_job_stitches_checkpointed_pages_back(ocr_app, tmp_path, monkeypatch):
+    import pikepdf
+
+    for name in ("PAGE_CACHE_DIR", "WORK_DIR"):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setattr(ocr_app, name, path)
+    # No tesseract or Ghostscript here: pages are "OCRed" in-process and PDF/A conversion is skipped
+    monkeypatch.setattr(ocr_app, "OCR_POOL", SimpleNamespace(map=map))
+    monkeypatch.setattr(ocr_app, "finish_pdf", shutil.copy)
+    input_pdf = tmp_path / "scan.pdf"
+    output_pdf = tmp_path / "ocr_scan.pdf"
+    make_document(input_pdf)
+
+    ocred = []
+    monkeypatch.setattr(ocr_app, "ocr_page", fake_ocr_page(1, ocred, fail_on="page_0003.pdf"))
+    with pytest.raises(RuntimeError):
+        ocr_app.process_pdf(input_pdf, output_pdf)
+    monkeypatch.setattr(ocr_app, "ocr_page", fake_ocr_page(2, ocred))
+    assert ocr_app.process_pdf(input_pdf, output_pdf) == "ocr_applied"
+
+    assert ocred == ["page_0001.pdf", "page_0002.pdf", "page_0003.pdf"]
+    with pikepdf.open(output_pdf) as pdf:
+        assert [page.obj.OCRRun for page in pdf.pages] == [1, 1, 2]
+        assert [page.obj.get("/Rotate", 0) for page in pdf.pages] == [0, 90, 0]
+        assert pdf.Root.PageLabels.Nums[1].S == pikepdf.Name.r
+        assert pdf.docinfo["/Title"] == "Resume test"
+        with pdf.open_outline() as outline:
+            item = outline.root[0]
+            assert item.title == "Second page"
+            assert pdf.pages.index(pikepdf.Page(item.destination[0])) == 1
+    assert list(ocr_app.WORK_DIR.iterdir()) == []
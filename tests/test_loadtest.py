@@ -0,0 +1,60 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import loadtest
+
+@pytest.mark.parametrize("pct, expected", [(0, 1), (20, 1), (50, 3), (90, 5), (100, 5)])
+def test_percentile_nearest_rank(pct, expected):
+    assert loadtest.percentile([1, 2, 3, 4, 5], pct) == expected
+
+def test_percentile_of_no_samples():
+    assert loadtest.percentile([], 50) is None
+
+class SlowClient:
+    def post_pdf(self, route, filename, data):
+        time.sleep(0.05)
+        return 200, b"ok"
+
+def test_latency_includes_client_side_queueing(tmp_path):
+    # 100 req/s against one worker that needs 50 ms each: requests pile up behind it
+    results, _, _, _ = loadtest.run_load(
+        "rotate", SlowClient(), [("a.pdf", b"%PDF")], total=5, rate=100, concurrency=1, server_dir=tmp_path
+    )
+    last = max(results, key=lambda r: r["index"])
+
+    assert last["service_ms"] < 100
+    assert last["latency_ms"] > 150
+
+def test_closed_loop_latency_is_service_time(tmp_path):
+    results, _, _, _ = loadtest.run_load(
+        "rotate", SlowClient(), [("a.pdf", b"%PDF")], total=10, rate=0, concurrency=1, server_dir=tmp_path
+    )
+
+    assert len(results) == 10
+    assert all(r["latency_ms"] == r["service_ms"] for r in results)
+    assert max(r["latency_ms"] for r in results) < 100
+
+def test_inprocess_mode_is_rejected_for_icd():
+    with pytest.raises(SystemExit):
+        loadtest.parse_args(["icd", "--mode", "inprocess"])
+
+def test_inprocess_ocr_run_reaches_the_ocr_workers(make_pdf, tmp_path, monkeypatch):
+    pytest.importorskip("flask")
+    pytest.importorskip("ocrmypdf")
+    # A fresh import of app.py, run in tmp_path; cwd, sys.path and the module are restored afterwards
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    monkeypatch.delitem(sys.modules, "app", raising=False)
+    pdf = make_pdf("scan.pdf", "ICD-10-CM: E11.9")
+    client = loadtest.InProcessClient(loadtest.TARGETS["ocr"]["app"], run_dir=tmp_path)
+
+    results, _, _, _ = loadtest.run_load(
+        "ocr", client, [("scan.pdf", Path(pdf).read_bytes())], total=1, rate=0, concurrency=1, server_dir=tmp_path
+    )
+
+    # Without tesseract or Ghostscript installed, the page still has to reach
+    # ocrmypdf in a worker process to fail this way rather than on pickling
+    assert results[0]["ok"] or "Could not find program" in results[0]["error"]
@@ -0,0 +1,29 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_RESULT = {"page_number": 3, "icd_codes": [], "text": "Consent form"}
+
+def test_concurrent_stores_of_one_page(icd_main):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: icd_main.cache_store("boilerplate", PAGE_RESULT), range(64)))
+
+    assert icd_main.cache_lookup("boilerplate") == {"icd_codes": [], "text": "Consent form"}
+    assert [p.name for p in icd_main.PAGE_CACHE_DIR.iterdir()] == ["boilerplate.json"]
+
+def test_evicted_entry_is_a_miss(icd_main):
+    icd_main.cache_store("gone", PAGE_RESULT)
+    (icd_main.PAGE_CACHE_DIR / "gone.json").unlink()
+
+    assert icd_main.cache_lookup("gone") is None
+
+def test_eviction_keeps_cache_under_byte_limit(icd_main):
+    for i in range(5):
+        icd_main.cache_store(f"page{i}", PAGE_RESULT)
+        # Older entries were used longer ago
+        os.utime(icd_main.PAGE_CACHE_DIR / f"page{i}.json", (time.time() - 100 + i,) * 2)
+    entry_size = (icd_main.PAGE_CACHE_DIR / "page0.json").stat().st_size
+
+    icd_main.evict_cache(icd_main.PAGE_CACHE_DIR, icd_main.PAGE_CACHE_MAX_ENTRIES, 2 * entry_size)
+
+    assert sorted(p.name for p in icd_main.PAGE_CACHE_DIR.iterdir()) == ["page3.json", "page4.json"]
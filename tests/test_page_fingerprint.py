@@ -0,0 +1,55 @@
+import pytest
+
+# Byte 57 ("9") is drawn with the glyph for "3" in the second font
+REMAPPED_NINE = "<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences [57 /three] >>"
+
+def fingerprints(backend, *paths):
+    from pdf_text import open_pages
+
+    result = []
+    for path in paths:
+        with open_pages(path, backend) as pages:
+            result.append(next(iter(pages)).fingerprint())
+    return result
+
+@pytest.mark.parametrize("backend, module", [("pdfplumber", "pdfplumber"), ("pymupdf", "fitz")])
+def test_pages_differing_only_in_font_do_not_collide(make_pdf, backend, module):
+    pytest.importorskip(module)
+    a = make_pdf("a.pdf", "ICD-10-CM: E11.9")
+    b = make_pdf("b.pdf", "ICD-10-CM: E11.9", encoding=REMAPPED_NINE)
+
+    fp_a, fp_b = fingerprints(backend, a, b)
+
+    assert fp_a != fp_b
+
+@pytest.mark.parametrize("backend, module", [("pdfplumber", "pdfplumber"), ("pymupdf", "fitz")])
+def test_same_page_matches_across_documents(make_pdf, backend, module):
+    pytest.importorskip(module)
+    a = make_pdf("a.pdf", "ICD-10-CM: E11.9")
+    b = make_pdf("b.pdf", "ICD-10-CM: E11.9", padding=3)
+
+    fp_a, fp_b = fingerprints(backend, a, b)
+
+    assert fp_a == fp_b
+
+def test_warm_cache_does_not_leak_codes_between_fonts(icd_main, make_pdf):
+    a = make_pdf("a.pdf", "ICD-10-CM: E11.9")
+    b = make_pdf("b.pdf", "ICD-10-CM: E11.9", encoding=REMAPPED_NINE)
+
+    icd_main.extract_icd_codes(a, backend="pdfplumber")
+    result = icd_main.extract_icd_codes(b, backend="pdfplumber")
+
+    assert [c["code"] for c in result[0]["icd_codes"]] == ["E11.3"]
+
+def test_ocr_cache_key_covers_fonts(ocr_app, make_pdf):
+    import pikepdf
+
+    a = make_pdf("a.pdf", "ICD-10-CM: E11.9")
+    b = make_pdf("b.pdf", "ICD-10-CM: E11.9", encoding=REMAPPED_NINE)
+    c = make_pdf("c.pdf", "ICD-10-CM: E11.9", padding=3)
+
+    with pikepdf.open(a) as pdf_a, pikepdf.open(b) as pdf_b, pikepdf.open(c) as pdf_c:
+        fp_a, fp_b, fp_c = (ocr_app.page_cache_key(pdf.pages[0]) for pdf in (pdf_a, pdf_b, pdf_c))
+
+    assert fp_a != fp_b
+    assert fp_a == fp_c